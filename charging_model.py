@@ -0,0 +1,184 @@
+import numpy as np # type: ignore
+import pandas as pd # type: ignore
+
+# --- 充電時間 / 電量模型 ---
+# 由車輛充電曲線 (SOC → 最大 kW) 與各電站的功率上限，一次性向量化計算
+# 所有候選電站的充電用時與結束電量，供規劃與批量模擬調用。
+
+# 測試車輛參數，可按實際車型修改
+DEFAULT_VEHICLE = {
+    "battery_kwh": 100.0,      # 可用電池容量
+    "pack_voltage": 750.0,     # 電池包標稱電壓 (V)
+    "min_pack_voltage": 550.0, # 電站最高電壓低於此值時無法直流充電
+    "onboard_ac_kw": 11.0,     # 車載交流充電機上限
+    "efficiency": 0.92,        # 電網側到電池的充電效率
+}
+
+# 車輛直流充電曲線：SOC (%) → 車端可接受的最大功率 (kW)
+DEFAULT_CHARGE_CURVE = (
+    np.array([0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100], dtype=np.float64),
+    np.array([120, 250, 260, 250, 230, 200, 170, 130, 90, 45, 10], dtype=np.float64),
+)
+
+# 電站缺少功率信息時的保守假設
+FALLBACK_DC_KW = 60.0
+FALLBACK_AC_KW = 7.0
+
+SOC_STEP = 0.5
+
+
+def station_power_limits(stations_df, vehicle=DEFAULT_VEHICLE):
+    """計算每個電站對本車可提供的最大功率 (kW) 與是否為直流，均為 NumPy 數組。
+
+    直流取 max_dc_power 與 max_dc_amps × 電壓 的較小值；max_dc_volts 低於
+    電池包最低電壓的電站視為無法充電 (功率為 0)。交流受車載充電機限制。
+    power_type_final 為 Unknown 或缺失時，按是否有直流功率信息推斷。
+    """
+    def column(name):
+        if name not in stations_df.columns:
+            return np.full(len(stations_df), np.nan)
+        return pd.to_numeric(stations_df[name], errors="coerce").to_numpy(dtype=np.float64)
+
+    dc_power = column("max_dc_power")
+    dc_amps = column("max_dc_amps")
+    dc_volts = column("max_dc_volts")
+    ac_power = column("max_ac_power")
+
+    if "power_type_final" in stations_df.columns:
+        power_type = stations_df["power_type_final"].astype(str).to_numpy()
+    else:
+        power_type = np.full(len(stations_df), "Unknown")
+    has_dc_info = ~np.isnan(dc_power) | ~np.isnan(dc_amps)
+    is_dc = (power_type == "DC") | ((power_type != "AC") & has_dc_info)
+
+    # 直流：電壓取電站上限與電池包電壓的較小值，再換算電流上限
+    volts = np.fmin(np.nan_to_num(dc_volts, nan=vehicle["pack_voltage"]), vehicle["pack_voltage"])
+    amps_limit = dc_amps * volts / 1000.0
+    dc_limit = np.fmin(dc_power, amps_limit)
+    dc_limit = np.where(np.isnan(dc_limit), FALLBACK_DC_KW, dc_limit)
+    dc_limit = np.where(volts < vehicle["min_pack_voltage"], 0.0, dc_limit)
+
+    ac_limit = np.fmin(np.nan_to_num(ac_power, nan=FALLBACK_AC_KW), vehicle["onboard_ac_kw"])
+
+    return np.where(is_dc, dc_limit, ac_limit), is_dc
+
+
+def charge_time_table(power_limits, is_dc, curve=DEFAULT_CHARGE_CURVE,
+                      vehicle=DEFAULT_VEHICLE, soc_step=SOC_STEP):
+    """生成每個電站從 0% 開始的累計充電用時表 (分鐘)。
+
+    返回 (soc_grid, cumulative)，cumulative 形狀為 (電站數, 網格點數)；
+    無法充電的電站其後續用時為 inf。
+    """
+    soc_grid = np.arange(0.0, 100.0 + soc_step / 2, soc_step)
+    mid_soc = soc_grid[:-1] + soc_step / 2
+
+    # 直流受車輛充電曲線限制；交流功率遠低於曲線，僅受車載充電機限制
+    vehicle_kw = np.interp(mid_soc, curve[0], curve[1])
+    limits = np.asarray(power_limits, dtype=np.float64)[:, None]
+    power = np.where(np.asarray(is_dc)[:, None], np.minimum(vehicle_kw[None, :], limits), limits)
+
+    step_kwh = vehicle["battery_kwh"] * soc_step / 100.0
+    with np.errstate(divide="ignore"):
+        step_minutes = step_kwh / (power * vehicle["efficiency"]) * 60.0
+    cumulative = np.zeros((len(limits), len(soc_grid)))
+    np.cumsum(step_minutes, axis=1, out=cumulative[:, 1:])
+    return soc_grid, cumulative
+
+
+def _time_at_soc(cumulative, soc, soc_step):
+    """在均勻 SOC 網格上逐行線性插值，得到到達 soc 時的累計用時。"""
+    pos = np.clip(soc, 0.0, 100.0) / soc_step
+    lo = np.minimum(np.floor(pos).astype(np.int64), cumulative.shape[1] - 2)
+    frac = pos - lo
+    rows = np.arange(cumulative.shape[0])
+    t_lo = cumulative[rows, lo]
+    t_hi = cumulative[rows, lo + 1]
+    with np.errstate(invalid="ignore"):
+        return np.where(frac > 0, t_lo + frac * (t_hi - t_lo), t_lo)
+
+
+def _soc_at_time(cumulative, soc_grid, minutes):
+    """_time_at_soc 的反函數：給定累計用時，逐行求出可達到的 SOC。"""
+    n_points = cumulative.shape[1]
+    hi = np.sum(cumulative <= minutes[:, None], axis=1)
+    hi = np.clip(hi, 1, n_points - 1)
+    rows = np.arange(cumulative.shape[0])
+    t_lo = cumulative[rows, hi - 1]
+    t_hi = cumulative[rows, hi]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        frac = np.clip((minutes - t_lo) / (t_hi - t_lo), 0.0, 1.0)
+    frac = np.nan_to_num(frac)
+    return soc_grid[hi - 1] + frac * (soc_grid[hi] - soc_grid[hi - 1])
+
+
+def simulate_charging(stations_df, start_soc, target_soc=80.0, max_minutes=None,
+                      curve=DEFAULT_CHARGE_CURVE, vehicle=DEFAULT_VEHICLE, soc_step=SOC_STEP):
+    """對所有候選電站一次性計算充電用時與結束電量。
+
+    start_soc / target_soc / max_minutes 可為標量或與電站數等長的數組；
+    到達 target_soc 或用滿 max_minutes 任一條件即結束充電。
+    返回與 stations_df 同索引的 DataFrame，包含 電量 (%)、用時 (分) 與平均功率。
+    """
+    n = len(stations_df)
+    power_limits, is_dc = station_power_limits(stations_df, vehicle)
+    soc_grid, cumulative = charge_time_table(power_limits, is_dc, curve, vehicle, soc_step)
+
+    start_soc = np.broadcast_to(np.asarray(start_soc, dtype=np.float64), (n,))
+    target_soc = np.maximum(np.broadcast_to(np.asarray(target_soc, dtype=np.float64), (n,)), start_soc)
+
+    t_start = _time_at_soc(cumulative, start_soc, soc_step)
+    t_end = _time_at_soc(cumulative, target_soc, soc_step)
+    if max_minutes is not None:
+        t_end = np.minimum(t_end, t_start + np.broadcast_to(np.asarray(max_minutes, dtype=np.float64), (n,)))
+
+    end_soc = np.maximum(_soc_at_time(cumulative, soc_grid, t_end), start_soc)
+    with np.errstate(invalid="ignore"):
+        duration = t_end - t_start
+    # 無法充電的電站：電量不變，用時記為 NaN
+    chargeable = power_limits > 0
+    end_soc = np.where(chargeable, end_soc, start_soc)
+    duration = np.where(chargeable, duration, np.nan)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_power = (end_soc - start_soc) / 100.0 * vehicle["battery_kwh"] / vehicle["efficiency"] / (duration / 60.0)
+
+    return pd.DataFrame({
+        "電量 (%)": end_soc,
+        "用時 (分)": duration,
+        "平均功率 (kW)": np.where(duration > 0, avg_power, 0.0),
+        "功率上限 (kW)": power_limits,
+    }, index=stations_df.index)
+
+
+def calibrate_charge_curve(sessions, curve=DEFAULT_CHARGE_CURVE, quantile=0.95, min_samples=30):
+    """用實測充電過程 (session_logs 的數組) 校準車輛充電曲線。
+
+    調用方應只傳入直流充電記錄，且電站功率上限高於車端曲線；每個 SOC 節點取
+    附近樣本功率的高分位數作為車端上限，樣本不足的節點沿用原曲線。
+    """
+    soc_points, kw_points = curve
+    soc_samples = []
+    kw_samples = []
+    for session in sessions:
+        if session is None or "soc" not in session or "power" not in session:
+            continue
+        soc_samples.append(np.asarray(session["soc"], dtype=np.float64))
+        kw_samples.append(np.asarray(session["power"], dtype=np.float64))
+    if not soc_samples:
+        return curve
+
+    soc = np.concatenate(soc_samples)
+    kw = np.concatenate(kw_samples)
+    valid = ~np.isnan(soc) & ~np.isnan(kw)
+    soc, kw = soc[valid], kw[valid]
+
+    # 每個 SOC 節點的取樣範圍為到相鄰節點的一半
+    edges = np.concatenate([[-np.inf], (soc_points[:-1] + soc_points[1:]) / 2, [np.inf]])
+    bins = np.digitize(soc, edges) - 1
+    calibrated = kw_points.astype(np.float64).copy()
+    for i in range(len(soc_points)):
+        bin_kw = kw[bins == i]
+        if len(bin_kw) >= min_samples:
+            calibrated[i] = np.quantile(bin_kw, quantile)
+    return soc_points.copy(), calibrated
@@ -7,6 +7,8 @@ import qrcode # type: ignore
 from io import BytesIO # type: ignore
 import datetime # type: ignore
 import os # type: ignore
+import uuid # type: ignore
+from session_logs import parse_session_log, save_session_log # type: ignore
 
 # --- 页面基础设置 ---
 st.set_page_config(layout="wide", page_title="On Mission")
@@ -28,6 +30,23 @@ def load_data(strategy_prefix):
         st.error(f"错误：找不到文件 {e.filename}。请确保已为两个策略都生成了报告文件。")
         return None, None, None
 
+# --- 現場測試記錄寫入 ---
+def append_test_record(record, save_file):
+    """追加一條測試記錄；舊文件缺少新增的列時先補齊列並重寫，保證表頭與數據列一致。"""
+    if os.path.isfile(save_file):
+        existing_columns = pd.read_csv(save_file, nrows=0, encoding='utf-8-sig').columns.tolist()
+        missing_columns = [col for col in record if col not in existing_columns]
+        if missing_columns:
+            existing_df = pd.read_csv(save_file, encoding='utf-8-sig', dtype=str)
+            for col in missing_columns:
+                existing_df[col] = ""
+            existing_df.to_csv(save_file, index=False, encoding='utf-8-sig')
+            existing_columns += missing_columns
+        df = pd.DataFrame([record]).reindex(columns=existing_columns)
+        df.to_csv(save_file, mode='a', header=False, index=False, encoding='utf-8-sig')
+    else:
+        pd.DataFrame([record]).to_csv(save_file, index=False, encoding='utf-8-sig')
+
 # --- 渲染 Kepler 地图的函数 (已参数化) ---
 def render_kepler_map(map_html_file):
     """读取并渲染指定的 Kepler HTML 地图文件。"""
@@ -176,6 +195,16 @@ with st.expander("現場測試記錄輸入", expanded=True):
         if selected_error_describe == "Other":
             error_describe_other = st.text_input("請輸入其他 Error Describe", "")
 
+        # 充電過程日誌（秒級 SOC / 電壓 / 電流 / 功率）
+        # 上傳框帶 key，提交成功後更換 key 以清空，避免同一份日誌被附到下一條記錄
+        if "session_log_uploader" not in st.session_state:
+            st.session_state["session_log_uploader"] = 0
+        session_log_file = st.file_uploader(
+            "充電過程日誌 (CSV，可選)",
+            type=["csv"],
+            key=f"session_log_{st.session_state['session_log_uploader']}",
+        )
+
         # 備註放到最下方
         remark = st.text_area("備註", "")
 
@@ -209,6 +238,14 @@ with st.expander("現場測試記錄輸入", expanded=True):
             return other if selected == "其他" and other else selected
 
         if st.button("提交記錄"):
+            record_id = f"{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+            session_log = None
+            if session_log_file is not None:
+                try:
+                    session_log = parse_session_log(session_log_file)
+                except ValueError as e:
+                    st.error(f"充電日誌解析失敗：{e}")
+                    st.stop()
             record = {
                 "日期": datetime.datetime.now().strftime("%Y-%m-%d"),
                 "站點": selected_station,
@@ -231,13 +268,26 @@ with st.expander("現場測試記錄輸入", expanded=True):
                 "測試結果": test_result,
                 "Error Describe": selected_error_describe,
                 "Error Describe_其他說明": error_describe_other,
-                "備註": remark
+                "備註": remark,
+                "記錄ID": record_id
             }
             save_file = "mission_test_records.csv"
-            file_exists = os.path.isfile(save_file)
-            df = pd.DataFrame([record])
-            df.to_csv(save_file, mode='a', header=not file_exists, index=False, encoding='utf-8-sig')
+            append_test_record(record, save_file)
+            # 記錄寫入成功後再保存充電日誌，避免出現沒有對應記錄的日誌
+            saved_log_message = None
+            if session_log is not None:
+                save_session_log(record_id, session_log)
+                saved_log_message = f"已保存充電日誌 {len(session_log['time'])} 筆數據點（記錄 ID：{record_id}）。"
+            # 更換上傳框 key 並重新運行以清空已上傳的日誌，提示信息留到重新運行後顯示
+            st.session_state["session_log_uploader"] += 1
+            st.session_state["record_saved"] = saved_log_message or ""
+            st.rerun()
+
+        if "record_saved" in st.session_state:
+            saved_log_message = st.session_state.pop("record_saved")
             st.success("已保存到檔案 mission_test_records.csv！")
+            if saved_log_message:
+                st.info(saved_log_message)
 
             if os.path.isfile("mission_test_records.csv"):
                 with open("mission_test_records.csv", "rb") as f:
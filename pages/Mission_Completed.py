@@ -5,6 +5,8 @@ import pydeck as pdk # type: ignore
 import json # type: ignore
 import folium # type: ignore
 from streamlit_folium import st_folium # type: ignore
+import os # type: ignore
+from session_logs import list_session_logs, load_session_log, lttb_downsample, minmax_downsample # type: ignore
 
 
 # --- 页面基础设置 ---
@@ -31,6 +33,95 @@ def load_data():
         st.error(f"错误：缺少必要的数据文件: {e.filename}。请先在 Jupyter Notebook 中运行数据生成步骤。")
         return None, None, None, None, None
 
+# --- 地图构建 (底图每次重建以保持脚本不变，站点数据按 策略+状态 缓存) ---
+STATUS_LAYER_STYLES = {
+    '成功': {'name': "✅ 成功站点 (Success)", 'color': 'green', 'icon': 'check-circle'},
+    '失败': {'name': "❌ 失败站点 (Fail)", 'color': 'red', 'icon': 'times-circle'},
+}
+
+def build_base_map():
+    """构建只包含底图的 Folium 地图，所有策略共用"""
+    final_report, _, _, _, _ = load_data()
+
+    # 定义高德地图底图URL和版权信息
+    gaode_tiles = "https://webrd01.is.autonavi.com/appmaptile?lang=zh_cn&size=1&scale=1&style=8&x={x}&y={y}&z={z}"
+    gaode_attribution = "Amap"
+
+    # 以全部策略的站点计算中心点，切换策略时底图保持不变
+    map_center = [final_report['latitude'].mean(), final_report['longitude'].mean()]
+
+    # 创建一个不带默认底图的 Folium 地图对象
+    m = folium.Map(
+        location=map_center,
+        zoom_start=10,
+        tiles=None  # 关键：不在这里指定底图
+    )
+
+    # 将高德地图作为一个独立的图层添加，并为其指定一个简洁的名称
+    folium.TileLayer(
+        tiles=gaode_tiles,
+        attr=gaode_attribution,
+        name="Amap"
+    ).add_to(m)
+    return m
+
+@st.cache_data
+def load_status_markers(strategy_char, status):
+    """取出某个策略下某个测试状态的站点标记数据；非'成功'的站点都归入'失败'"""
+    final_report, _, _, _, _ = load_data()
+    strategy_rows = final_report[final_report['strategy'] == strategy_char]
+    is_success = strategy_rows['status'] == '成功'
+    layer_df = strategy_rows[is_success if status == '成功' else ~is_success]
+
+    markers = []
+    for _, row in layer_df.iterrows():
+        popup_html = f"""
+        <b>站点名称:</b> {row['station_name']}<br>
+        <b>运营商:</b> {row['operator_name']}<br>
+        <b>状态:</b> {row['status']}<br>
+        <b>失败原因:</b> {row['failure_reason']}
+        """
+        markers.append(([row['latitude'], row['longitude']], popup_html))
+    return markers
+
+def build_status_layer(strategy_char, status):
+    """用缓存的标记数据构建图层；每次运行新建，避免修改共享的 Folium 对象"""
+    style = STATUS_LAYER_STYLES[status]
+    layer = folium.FeatureGroup(name=style['name'])
+    for location, popup_html in load_status_markers(strategy_char, status):
+        folium.Marker(
+            location=location,
+            popup=folium.Popup(popup_html, max_width=300),
+            icon=folium.Icon(color=style['color'], icon=style['icon'])
+        ).add_to(layer)
+    return layer
+
+@st.cache_data
+def load_session_curve(record_id, method, max_points):
+    """读取单次充电过程并降采样，只把 max_points 个点送到前端"""
+    session = load_session_log(record_id)
+    if session is None:
+        return None
+    downsample = lttb_downsample if method == "LTTB" else minmax_downsample
+    minutes = session['time'] / 60.0
+    x, y = downsample(minutes, session['power'], max_points)
+    return pd.DataFrame({'时间 (分)': x, '功率 (kW)': y, 'record_id': record_id}), len(minutes)
+
+@st.cache_data
+def read_test_records(mtime):
+    """按文件修改时间缓存测试记录，文件更新后自动重新读取"""
+    try:
+        return pd.read_csv("mission_test_records.csv", encoding='utf-8-sig', dtype=str)
+    except pd.errors.ParserError:
+        st.warning("mission_test_records.csv 格式不一致，充电过程曲线将不显示站点名称。")
+        return pd.DataFrame()
+
+def load_test_records():
+    """加载现场测试记录，用于给充电过程曲线标注站点"""
+    if not os.path.isfile("mission_test_records.csv"):
+        return pd.DataFrame()
+    return read_test_records(os.path.getmtime("mission_test_records.csv"))
+
 # --- 加载数据 ---
 final_report_df, report_a_df, report_b_df, hotel_a_info, hotel_b_info = load_data()
 
@@ -125,59 +216,64 @@ with analysis_cols[1]:
 st.header("Location")
 
 if not strategy_df.empty:
-    # 定义高德地图底图URL和版权信息
-    gaode_tiles = "https://webrd01.is.autonavi.com/appmaptile?lang=zh_cn&size=1&scale=1&style=8&x={x}&y={y}&z={z}"
-    gaode_attribution = "Amap"
-
-    # 计算地图中心点
-    map_center = [strategy_df['latitude'].mean(), strategy_df['longitude'].mean()]
+    # 按状态筛选站点；只有变化的图层会推送到浏览器，底图与视角保持不变
+    selected_statuses = st.multiselect(
+        "Show status:",
+        options=list(STATUS_LAYER_STYLES),
+        default=list(STATUS_LAYER_STYLES),
+    )
+    status_layers = [build_status_layer(strategy_char, status) for status in selected_statuses]
 
-    # --- 修改点 ---
-    # 1. 创建一个不带默认底图的 Folium 地图对象
-    m = folium.Map(
-        location=map_center, 
-        zoom_start=10, 
-        tiles=None  # 关键：不在这里指定底图
+    st_folium(
+        build_base_map(),
+        width='100%',
+        height=800,
+        key="mission_completed_map",
+        feature_group_to_add=status_layers,
+        layer_control=folium.LayerControl(collapsed=False),  # 包含底图与动态站点图层，可在地图中勾选
+        returned_objects=[],
     )
 
-    # 2. 将高德地图作为一个独立的图层添加，并为其指定一个简洁的名称
-    folium.TileLayer(
-        tiles=gaode_tiles,
-        attr=gaode_attribution,
-        name="Amap"  # 关键：这个名称会显示在图层控制器中
-    ).add_to(m)
+else:
+    st.warning("没有可供显示的地理数据。")
 
-    # 创建“成功”和“失败”两个图层组
-    success_layer = folium.FeatureGroup(name="✅ 成功站点 (Success)", show=True).add_to(m)
-    fail_layer = folium.FeatureGroup(name="❌ 失败站点 (Fail)", show=True).add_to(m)
 
-    # 将数据点添加到对应的图层
-    for _, row in strategy_df.iterrows():
-        popup_html = f"""
-        <b>站点名称:</b> {row['station_name']}<br>
-        <b>运营商:</b> {row['operator_name']}<br>
-        <b>状态:</b> {row['status']}<br>
-        <b>失败原因:</b> {row['failure_reason']}
-        """
-        if row['status'] == '成功':
-            folium.Marker(
-                location=[row['latitude'], row['longitude']],
-                popup=folium.Popup(popup_html, max_width=300),
-                icon=folium.Icon(color='green', icon='check-circle')
-            ).add_to(success_layer)
-        else:
-            folium.Marker(
-                location=[row['latitude'], row['longitude']],
-                popup=folium.Popup(popup_html, max_width=300),
-                icon=folium.Icon(color='red', icon='times-circle')
-            ).add_to(fail_layer)
-
-    # 添加图层控制器，让用户可以自由勾选
-    folium.LayerControl(collapsed=False).add_to(m)
-
-    # 在 Streamlit 中渲染地图
-    # st.info("您可以在地图右上角勾选图层，以筛选查看成功或失败的站点。")
-    st_folium(m, width='100%', height=800)
+# --- 4. 充电过程功率曲线 ---
+st.header("Charging Sessions")
 
+session_ids = list_session_logs()
+if not session_ids:
+    st.info("暂无已上传的充电过程日志。")
 else:
-    st.warning("没有可供显示的地理数据。")
\ No newline at end of file
+    test_records_df = load_test_records()
+    station_by_id = {}
+    if '記錄ID' in test_records_df.columns:
+        station_by_id = test_records_df.set_index('記錄ID')['站點'].astype(str).to_dict()
+
+    curve_cols = st.columns([2, 1, 1])
+    selected_sessions = curve_cols[0].multiselect(
+        "Select sessions:",
+        options=session_ids,
+        default=session_ids[-5:],
+        format_func=lambda rid: f"{station_by_id.get(rid, '未知站点')} ({rid})",
+    )
+    downsample_method = curve_cols[1].radio("Downsampling", ["LTTB", "Min-Max"], horizontal=True)
+    max_points = curve_cols[2].slider("Points per curve", 200, 5000, 1000, step=100)
+
+    curves = []
+    raw_points = 0
+    for record_id in selected_sessions:
+        result = load_session_curve(record_id, downsample_method, max_points)
+        if result is None:
+            continue
+        curve_df, n_raw = result
+        curve_df['站点'] = station_by_id.get(record_id, record_id)
+        curves.append(curve_df)
+        raw_points += n_raw
+
+    if curves:
+        curves_df = pd.concat(curves, ignore_index=True)
+        fig = px.line(curves_df, x='时间 (分)', y='功率 (kW)', color='站点',
+                      line_group='record_id', title='Charging Power Curves')
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"原始数据点 {raw_points} 个，降采样后绘制 {len(curves_df)} 个。")
@@ -0,0 +1,141 @@
+import os # type: ignore
+import numpy as np # type: ignore
+import pandas as pd # type: ignore
+
+# --- 充電過程日誌 (秒級 SOC / 電壓 / 電流 / 功率) 的解析、存儲與降採樣 ---
+
+SESSION_LOG_DIR = "session_logs"
+
+# 各充電樁/車端導出的日誌列名不統一，這裡統一映射到標準列名
+COLUMN_ALIASES = {
+    "time": ["time", "timestamp", "datetime", "時間", "时间", "絕對時間"],
+    "soc": ["soc", "soc(%)", "soc (%)", "電量(%)", "电量(%)", "電量 (%)"],
+    "voltage": ["voltage", "voltage(v)", "v", "電壓(v)", "电压(v)", "電壓 (v)"],
+    "current": ["current", "current(a)", "a", "電流(a)", "电流(a)", "電流 (a)"],
+    "power": ["power", "power(kw)", "kw", "功率(kw)", "功率 (kw)"],
+}
+VALUE_COLUMNS = ["soc", "voltage", "current", "power"]
+
+
+def _normalize_columns(raw_df):
+    """把日誌的原始列名映射為標準列名，未識別的列直接丟棄。"""
+    lookup = {}
+    for std_name, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            lookup[alias] = std_name
+    renamed = {}
+    for col in raw_df.columns:
+        key = str(col).strip().lower()
+        if key in lookup and lookup[key] not in renamed.values():
+            renamed[col] = lookup[key]
+    return raw_df[list(renamed)].rename(columns=renamed)
+
+
+def parse_session_log(file):
+    """解析上傳的充電日誌 (CSV)，返回按列存放的 NumPy 數組。
+
+    time 為相對開始時刻的秒數 (float64)，其餘列為 float32；
+    缺少功率列時由電壓 × 電流推算。
+    """
+    df = _normalize_columns(pd.read_csv(file))
+    if "time" not in df.columns:
+        raise ValueError("充電日誌缺少時間列 (time / timestamp / 時間)。")
+
+    # 按非空值判斷格式：多數為數字時按秒數處理 (充電樁常見的導出格式)，
+    # 否則按時間戳解析；兩種情況下無法解析的行都會丟棄
+    numeric = pd.to_numeric(df["time"], errors="coerce")
+    if numeric.notna().sum() * 2 > df["time"].notna().sum():
+        seconds = numeric.to_numpy(dtype=np.float64)
+    else:
+        timestamps = pd.to_datetime(df["time"], errors="coerce")
+        first = timestamps.dropna().min()
+        seconds = (timestamps - first).dt.total_seconds().to_numpy(dtype=np.float64)
+    valid = ~np.isnan(seconds)
+    if not valid.any():
+        raise ValueError("充電日誌的時間列無法解析。")
+
+    arrays = {"time": seconds[valid].astype(np.float64)}
+    for name in VALUE_COLUMNS:
+        if name in df.columns:
+            values = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float32)
+            arrays[name] = values[valid]
+    if "power" not in arrays and "voltage" in arrays and "current" in arrays:
+        arrays["power"] = arrays["voltage"] * arrays["current"] / np.float32(1000.0)
+    if "power" not in arrays:
+        raise ValueError("充電日誌缺少功率列，且無法由電壓與電流推算。")
+
+    order = np.argsort(arrays["time"], kind="stable")
+    return {name: values[order] for name, values in arrays.items()}
+
+
+def save_session_log(record_id, arrays, log_dir=SESSION_LOG_DIR):
+    """以記錄 ID 為鍵，把一次充電過程保存為壓縮的 .npz 文件。"""
+    os.makedirs(log_dir, exist_ok=True)
+    path = os.path.join(log_dir, f"{record_id}.npz")
+    np.savez_compressed(path, **arrays)
+    return path
+
+
+def load_session_log(record_id, log_dir=SESSION_LOG_DIR):
+    """讀取指定記錄 ID 的充電過程；不存在時返回 None。"""
+    path = os.path.join(log_dir, f"{record_id}.npz")
+    if not os.path.isfile(path):
+        return None
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def list_session_logs(log_dir=SESSION_LOG_DIR):
+    """列出所有已保存充電過程的記錄 ID。"""
+    if not os.path.isdir(log_dir):
+        return []
+    return sorted(name[:-4] for name in os.listdir(log_dir) if name.endswith(".npz"))
+
+
+def minmax_downsample(x, y, n_out):
+    """每個分桶保留最小值與最大值，保證功率尖峰不會在降採樣後消失。"""
+    n = len(x)
+    if n <= n_out or n_out < 4:
+        return x, y
+    n_bins = n_out // 2
+    edges = np.linspace(0, n, n_bins + 1).astype(np.int64)
+    starts = edges[:-1]
+    y_safe = np.nan_to_num(y, nan=-np.inf)
+    idx_max = np.array([s + np.argmax(y_safe[s:e]) for s, e in zip(starts, edges[1:])])
+    y_safe = np.nan_to_num(y, nan=np.inf)
+    idx_min = np.array([s + np.argmin(y_safe[s:e]) for s, e in zip(starts, edges[1:])])
+    idx = np.unique(np.concatenate([idx_min, idx_max]))
+    return x[idx], y[idx]
+
+
+def lttb_downsample(x, y, n_out):
+    """Largest-Triangle-Three-Buckets 降採樣，保留曲線形狀的同時把點數壓到 n_out。"""
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return x, y
+
+    xf = np.asarray(x, dtype=np.float64)
+    yf = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    # 每個分桶的平均點，供上一個分桶選點時作為第三個頂點
+    bucket_sums_x = np.add.reduceat(xf[1:n - 1], edges[:-1] - 1)
+    bucket_sums_y = np.add.reduceat(yf[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(bucket_sums_x / counts, xf[-1])
+    avg_y = np.append(bucket_sums_y / counts, yf[-1])
+
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0] = 0
+    idx[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # 三角形面積 (省略常數 1/2)
+        area = np.abs(
+            (xf[prev] - avg_x[i + 1]) * (yf[start:end] - yf[prev])
+            - (xf[prev] - xf[start:end]) * (avg_y[i + 1] - yf[prev])
+        )
+        prev = start + int(np.argmax(area))
+        idx[i + 1] = prev
+    return x[idx], y[idx]